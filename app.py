@@ -12,11 +12,15 @@ Routes :
 """
 
 import csv
-import io
+import math
 import os
+import secrets
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import wraps
-from types import SimpleNamespace
+from itertools import islice
+from pathlib import Path
 
 import re
 
@@ -24,24 +28,33 @@ import requests
 from dotenv import load_dotenv
 from flask import (
     Flask,
+    Response,
     jsonify,
-    make_response,
     redirect,
     render_template,
     request,
     session,
+    stream_with_context,
     url_for,
 )
 
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from supabase import create_client as _mk_supabase
 
 from recherche_entreprises import (
     FULLENRICH_BASE_URL,
-    FULLENRICH_POLL_INTERVAL,
-    FULLENRICH_POLL_MAX,
-    _fullenrich_key,
+    FULLENRICH_BATCH_SIZE,
+    FULLENRICH_ENRICH_FIELDS,
+    FULLENRICH_MAX_PARALLEL,
+    PAPPERS_MAX_WORKERS,
+    _FE_SESSION,
+    cached_company_details,
     extract_company_info,
+    fullenrich_poll_delays,
     get_company_details,
+    retry_after_seconds,
     search_datagouv,
     search_pappers,
 )
@@ -51,8 +64,53 @@ from recherche_entreprises import (
 # ---------------------------------------------------------------------------
 load_dotenv()
 
+
+def _secret_key() -> str:
+    """
+    SECRET_KEY est obligatoire en production. En local (FLASK_DEBUG=1), une clé
+    est générée une fois puis relue depuis .secret_key : les sessions survivent
+    aux redémarrages.
+    """
+    key = os.environ.get("SECRET_KEY")
+    if key:
+        return key
+    if os.environ.get("FLASK_DEBUG", "0") != "1":
+        raise RuntimeError("SECRET_KEY manquante : définissez-la dans l'environnement.")
+    path = Path(__file__).with_name(".secret_key")
+    if path.exists():
+        return path.read_text().strip()
+    key = secrets.token_hex(32)
+    path.write_text(key)
+    return key
+
+
+class _ORJSONProvider(DefaultJSONProvider):
+    """
+    Sérialisation JSON via orjson (jsonify et request.get_json).
+    Pas de tri des clés ni d'indentation : inutile pour le front, coûteux sur /api/search.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY", os.urandom(32).hex())
+app.json = _ORJSONProvider(app)
+
+# Compression gzip/brotli des réponses texte (JSON de recherche, exports CSV, pages)
+app.config["COMPRESS_MIMETYPES"] = ["application/json", "text/csv", "text/html"]
+app.config["COMPRESS_LEVEL"] = 6
+Compress(app)
+app.secret_key = _secret_key()
 
 APP_PASSWORD = os.environ.get("APP_PASSWORD", "admin123")
 
@@ -71,6 +129,31 @@ CSV_FIELDS = [
     "pappers_url",
 ]
 
+# Champs renvoyés au navigateur par /api/search (les champs "_" restent internes)
+PUBLIC_FIELDS = (*CSV_FIELDS, "secteur", "source")
+
+# Appels Pappers /entreprise lancés en parallèle (I/O réseau uniquement).
+# La taille du pool borne le nombre de requêtes simultanées vers Pappers.
+_DETAILS_POOL = ThreadPoolExecutor(max_workers=PAPPERS_MAX_WORKERS)
+
+# ---------------------------------------------------------------------------
+# Pages statiques
+# ---------------------------------------------------------------------------
+
+# Templates sans variable : rendus une fois, puis servis depuis la mémoire
+_PAGE_CACHE: dict[str, str] = {}
+
+
+def _static_page(template):
+    """Rend un template sans contexte, mis en cache hors mode debug."""
+    html = _PAGE_CACHE.get(template)
+    if html is None:
+        html = render_template(template)
+        if not app.debug:
+            _PAGE_CACHE[template] = html
+    return html
+
+
 # ---------------------------------------------------------------------------
 # Authentification
 # ---------------------------------------------------------------------------
@@ -95,6 +178,8 @@ def login():
             session.permanent = True
             return redirect(url_for("index"))
         error = "Mot de passe incorrect."
+    if error is None:
+        return _static_page("login.html")
     return render_template("login.html", error=error)
 
 
@@ -112,7 +197,7 @@ def logout():
 @app.route("/")
 @login_required
 def index():
-    return render_template("index.html")
+    return _static_page("index.html")
 
 
 @app.route("/health")
@@ -126,10 +211,96 @@ def health():
 
 
 def _int(val):
-    try:
-        return int(val) if val else None
-    except (TypeError, ValueError):
+    """Entier saisi dans un formulaire, ou None si vide / non numérique."""
+    if not val:
         return None
+    if isinstance(val, int):
+        return int(val)
+    if isinstance(val, float):
+        return int(val) if math.isfinite(val) else None
+    s = str(val).strip()
+    digits = s[1:] if s[:1] in ("-", "+") else s
+    return int(s) if digits.isdecimal() else None
+
+
+def _str(val):
+    return (val or "").strip()
+
+
+def _str_or_none(val):
+    return (val or "").strip() or None
+
+
+@dataclass(slots=True)
+class SearchArgs:
+    """Critères de recherche, même interface que l'argparse.Namespace de la CLI."""
+    secteur: str
+    region: str | None
+    departement: str | None
+    ca_min: int | None
+    ca_max: int | None
+    age_min_dirigeant: int | None
+    max_resultats: int
+    nom_entreprise: str | None
+    nom_dirigeant: str | None
+    prenom_dirigeant: str | None
+    # Filtres avancés
+    categorie_juridique: str | None
+    effectif_min: int | None
+    effectif_max: int | None
+    resultat_net_min: int | None
+    resultat_net_max: int | None
+    date_creation_min: str | None
+    ville: str | None
+    statut_rcs: str | None
+    entreprise_cessee: bool
+
+
+# Champ SearchArgs → (clé JSON du formulaire, conversion)
+_SEARCH_SCHEMA = {
+    "secteur":             ("secteur", _str),
+    "region":              ("region", _str_or_none),
+    "departement":         ("departement", _str_or_none),
+    "ca_min":              ("ca_min", _int),
+    "ca_max":              ("ca_max", _int),
+    "age_min_dirigeant":   ("age_min_dirigeant", _int),
+    "max_resultats":       ("max_resultats", lambda v: _int(v) or 20),
+    "nom_entreprise":      ("nom_entreprise", _str_or_none),
+    "nom_dirigeant":       ("nom_dirigeant", _str_or_none),
+    "prenom_dirigeant":    ("prenom_dirigeant", _str_or_none),
+    "categorie_juridique": ("forme_juridique", _str_or_none),
+    "effectif_min":        ("effectif_min", _int),
+    "effectif_max":        ("effectif_max", _int),
+    "resultat_net_min":    ("resultat_net_min", _int),
+    "resultat_net_max":    ("resultat_net_max", _int),
+    "date_creation_min":   ("date_creation_min", _str_or_none),
+    "ville":               ("ville", _str_or_none),
+    "statut_rcs":          ("statut_rcs", _str_or_none),
+    # en_activite absent = entreprises actives uniquement
+    "entreprise_cessee":   ("en_activite", lambda v: v is not None and not v),
+}
+
+
+def _search_args(data: dict) -> SearchArgs:
+    return SearchArgs(**{
+        field: coerce(data.get(key)) for field, (key, coerce) in _SEARCH_SCHEMA.items()
+    })
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne formatée au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv(fieldnames, rows):
+    """Génère le CSV ligne par ligne (séparateur ";", UTF-8 avec BOM pour Excel)."""
+    writer = csv.writer(_Echo(), delimiter=";")
+    yield "\ufeff".encode("utf-8")
+    yield writer.writerow(fieldnames).encode("utf-8")
+    for row in rows:
+        yield writer.writerow([row.get(k, "") for k in fieldnames]).encode("utf-8")
 
 
 # Codes Pappers tranche_effectif → (min, max) salariés
@@ -152,6 +323,11 @@ _PAPPERS_TRANCHE = {
     "53": (10000, None),
 }
 
+_EFF_ENTRE_RE = re.compile(r"Entre\s+([\d\s]+)\s+et\s+([\d\s]+)")
+_EFF_SALARIES_RE = re.compile(r"^(\d+)\s+salarié")
+_EFF_ET_PLUS_RE = re.compile(r"^([\d\s]+)\s+et\s+plus")
+_EFF_A_RE = re.compile(r"^(\d+)\s+à\s+(\d+)$")
+
 
 def _parse_effectif(val):
     """Parse une valeur effectif vers (lo, hi) inclusive.
@@ -168,119 +344,106 @@ def _parse_effectif(val):
     if s in _PAPPERS_TRANCHE:
         return _PAPPERS_TRANCHE[s]
     # Nombre simple
-    try:
-        n = int(s)
+    n = _int(s)
+    if n is not None:
         return n, n
-    except ValueError:
-        pass
     # "Entre X et Y salariés" (champ effectif Pappers /entreprise)
-    m = re.match(r"Entre\s+([\d\s]+)\s+et\s+([\d\s]+)", s)
+    m = _EFF_ENTRE_RE.match(s)
     if m:
         return int(m.group(1).replace(" ", "")), int(m.group(2).replace(" ", ""))
     # "0 salarié" ou "X salarié(s)"
-    m = re.match(r"^(\d+)\s+salarié", s)
+    m = _EFF_SALARIES_RE.match(s)
     if m:
         n = int(m.group(1))
         return n, n
     # "X 000 et plus"
-    m = re.match(r"^([\d\s]+)\s+et\s+plus", s)
+    m = _EFF_ET_PLUS_RE.match(s)
     if m:
         return int(m.group(1).replace(" ", "")), None
     # "X à Y"
-    m = re.match(r"^(\d+)\s+à\s+(\d+)$", s)
+    m = _EFF_A_RE.match(s)
     if m:
         return int(m.group(1)), int(m.group(2))
     return None, None
 
 
-def _filter_effectif(companies, min_val, max_val):
-    """Filtre côté serveur sur _effectifs_finances.
-    Parse les tranches Pappers ("10 à 19", "10000 et plus").
-    Inclut les entreprises sans effectif connu (inconnu ≠ exclu).
-    """
-    if min_val is None and max_val is None:
-        return companies
-    result = []
-    for c in companies:
-        lo, hi = _parse_effectif(c.get("_effectifs_finances"))
-        if lo is None:
-            # Effectif inconnu → on garde
-            result.append(c)
-            continue
-        # Exclure si toute la tranche est au-dessus du max demandé
-        if max_val is not None and lo > max_val:
-            continue
-        # Exclure si toute la tranche est en-dessous du min demandé
-        # hi=None ("et plus") ne peut pas être en-dessous d'un min
-        if min_val is not None and hi is not None and hi < min_val:
-            continue
-        result.append(c)
-    return result
+def _num(val):
+    """Convertit en int, ou None si la valeur n'est pas numérique."""
+    # Cas courants (valeurs déjà typées par extract_company_info) sans try/except
+    if val is None:
+        return None
+    if isinstance(val, int):
+        return int(val)
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
 
 
-def _filter_ca(companies, ca_min, ca_max):
-    """Filtre côté serveur sur chiffre_affaires.
-    Nécessaire quand la source est data.gouv.fr (pas de filtre CA natif).
-    Inclut les entreprises sans CA connu.
+def _search_filter(args: SearchArgs):
+    """Prédicat des filtres côté serveur (CA, effectif, résultat net, âge du dirigeant),
+    ou None si aucun filtre n'est actif.
+    Le CA est filtré ici car data.gouv.fr n'a pas de filtre CA natif.
+    Les tranches Pappers ("10 à 19", "10000 et plus") sont comparées par bornes.
+    Inclut les entreprises sans valeur connue (inconnu ≠ exclu).
     """
-    if ca_min is None and ca_max is None:
-        return companies
-    result = []
-    for c in companies:
-        val = c.get("chiffre_affaires")
-        if not val:
-            result.append(c)
-            continue
-        try:
-            n = int(val)
-            if ca_min is not None and n < ca_min:
-                continue
-            if ca_max is not None and n > ca_max:
-                continue
-            result.append(c)
-        except (TypeError, ValueError):
-            result.append(c)
-    return result
-
-
-def _filter_age_dirigeant(companies, min_age):
-    """Filtre côté serveur sur age_dirigeant. Inclut les entreprises sans âge connu."""
-    if min_age is None:
-        return companies
-    result = []
-    for c in companies:
-        age = c.get("age_dirigeant")
-        if not age:
-            result.append(c)
-            continue
-        try:
-            if int(age) >= min_age:
-                result.append(c)
-        except (TypeError, ValueError):
-            result.append(c)
-    return result
-
-
-def _filter_resultat_net(companies, min_val, max_val):
-    """Filtre côté serveur sur _resultat_net. Inclut les entreprises sans valeur connue."""
-    if min_val is None and max_val is None:
-        return companies
-    result = []
-    for c in companies:
-        val = c.get("_resultat_net")
-        if val is None:
-            result.append(c)
-            continue
-        try:
-            n = int(val)
-            if min_val is not None and n < min_val:
-                continue
-            if max_val is not None and n > max_val:
-                continue
-            result.append(c)
-        except (TypeError, ValueError):
-            result.append(c)
-    return result
+    ca_min, ca_max = args.ca_min, args.ca_max
+    eff_min, eff_max = args.effectif_min, args.effectif_max
+    rn_min, rn_max = args.resultat_net_min, args.resultat_net_max
+    min_age = args.age_min_dirigeant
+    ca_has = ca_min is not None or ca_max is not None
+    eff_has = eff_min is not None or eff_max is not None
+    rn_has = rn_min is not None or rn_max is not None
+    if not (ca_has or eff_has or rn_has or min_age is not None):
+        return None
+
+    def keep(c):
+        if ca_has:
+            val = c.get("chiffre_affaires")
+            n = _num(val) if val else None
+            if n is not None:
+                if ca_min is not None and n < ca_min:
+                    return False
+                if ca_max is not None and n > ca_max:
+                    return False
+        if eff_has:
+            lo, hi = _parse_effectif(c.get("_effectifs_finances"))
+            if lo is not None:
+                # Exclure si toute la tranche est au-dessus du max demandé
+                if eff_max is not None and lo > eff_max:
+                    return False
+                # Exclure si toute la tranche est en-dessous du min demandé
+                # hi=None ("et plus") ne peut pas être en-dessous d'un min
+                if eff_min is not None and hi is not None and hi < eff_min:
+                    return False
+        if rn_has:
+            n = _num(c.get("_resultat_net"))
+            if n is not None:
+                if rn_min is not None and n < rn_min:
+                    return False
+                if rn_max is not None and n > rn_max:
+                    return False
+        if min_age is not None:
+            age = c.get("age_dirigeant")
+            n = _num(age) if age else None
+            if n is not None and n < min_age:
+                return False
+        return True
+
+    return keep
+
+
+def _clean_row(c: dict) -> dict:
+    """Ligne renvoyée au front : champs publics + données pour l'enrichissement Fullenrich."""
+    row = {k: c.get(k) for k in PUBLIC_FIELDS}
+    if c.get("_prenom") or c.get("_nom"):
+        row["_enrich"] = {
+            "prenom": c.get("_prenom", ""),
+            "nom": c.get("_nom", ""),
+            "domain": c.get("_domaine", ""),
+            "company_name": c.get("_nom_entreprise_raw", ""),
+        }
+    return row
 
 
 # ---------------------------------------------------------------------------
@@ -288,69 +451,37 @@ def _filter_resultat_net(companies, min_val, max_val):
 # ---------------------------------------------------------------------------
 
 
+# Critères dont au moins un (ou le secteur) doit être renseigné
+_REQUIRED_ANY = (
+    "region", "departement", "ca_min", "ca_max", "ville",
+    "nom_entreprise", "nom_dirigeant", "prenom_dirigeant",
+)
+
+
 @app.route("/api/search", methods=["POST"])
 @login_required
 def api_search():
     data = request.get_json(silent=True) or {}
-    secteur = data.get("secteur", "").strip()
+    args = _search_args(data)
 
     # Validation : au moins un filtre requis
-    if not any([
-        secteur,
-        data.get("region"),
-        data.get("departement"),
-        data.get("ca_min"),
-        data.get("ca_max"),
-        data.get("ville"),
-        data.get("nom_entreprise"),
-        data.get("nom_dirigeant"),
-        data.get("prenom_dirigeant"),
-    ]):
+    if not (args.secteur or any(data.get(k) for k in _REQUIRED_ANY)):
         return jsonify({"error": "Veuillez renseigner au moins un critère de recherche."}), 400
-
-    args = SimpleNamespace(
-        secteur=secteur,
-        region=data.get("region", "").strip() or None,
-        departement=data.get("departement", "").strip() or None,
-        ca_min=_int(data.get("ca_min")),
-        ca_max=_int(data.get("ca_max")),
-        age_min_dirigeant=_int(data.get("age_min_dirigeant")),
-        max_resultats=_int(data.get("max_resultats")) or 20,
-        nom_entreprise=data.get("nom_entreprise", "").strip() or None,
-        nom_dirigeant=data.get("nom_dirigeant", "").strip() or None,
-        prenom_dirigeant=data.get("prenom_dirigeant", "").strip() or None,
-        # Filtres avancés
-        categorie_juridique=data.get("forme_juridique", "").strip() or None,
-        effectif_min=_int(data.get("effectif_min")),
-        effectif_max=_int(data.get("effectif_max")),
-        resultat_net_min=_int(data.get("resultat_net_min")),
-        resultat_net_max=_int(data.get("resultat_net_max")),
-        date_creation_min=data.get("date_creation_min", "").strip() or None,
-        ville=data.get("ville", "").strip() or None,
-        statut_rcs=data.get("statut_rcs", "").strip() or None,
-        entreprise_cessee=not data.get("en_activite", True),
-    )
+    if args.max_resultats < 1:
+        return jsonify({"error": "Le nombre maximum de résultats doit être positif."}), 400
 
     # Si des filtres serveur sont actifs, récupérer plus de résultats bruts.
     # En mode data.gouv.fr, CA/résultat/âge sont filtrés nativement par l'API ;
     # seul l'effectif reste côté serveur (conversion tranche ↔ min/max).
     user_max = args.max_resultats
-    use_pappers_for_has = data.get("use_pappers", False)
-    if use_pappers_for_has:
-        has_server_filters = any([
-            args.effectif_min, args.effectif_max,
-            args.resultat_net_min, args.resultat_net_max,
-            args.age_min_dirigeant,
-            args.ca_min, args.ca_max,
-        ])
-    else:
-        # data.gouv.fr : CA/résultat/effectif filtrés côté serveur
-        # → inclut les entreprises sans données financières (finances: null)
-        has_server_filters = any([
-            args.effectif_min, args.effectif_max,
-            args.ca_min, args.ca_max,
-            args.resultat_net_min, args.resultat_net_max,
-        ])
+    # data.gouv.fr : CA/résultat/effectif filtrés côté serveur
+    # → inclut les entreprises sans données financières (finances: null)
+    # Pappers : l'âge du dirigeant est en plus filtré côté serveur
+    has_server_filters = any((
+        args.effectif_min, args.effectif_max,
+        args.ca_min, args.ca_max,
+        args.resultat_net_min, args.resultat_net_max,
+    )) or bool(data.get("use_pappers", False) and args.age_min_dirigeant)
     if has_server_filters:
         args.max_resultats = min(user_max * 4, 80)
 
@@ -378,41 +509,47 @@ def api_search():
 
     # ── Détails Pappers /entreprise (uniquement en mode Pappers) ───────────
     # En mode data.gouv.fr, CA/résultat/secteur sont déjà dans le résultat normalisé
-    pappers_detail_calls = 0
-    companies_info = []
-    for company in companies_raw:
-        siren = company.get("siren", "")
-        details = {}
-        if siren and use_pappers:
-            details = get_company_details(siren)
-            pappers_detail_calls += 1
-            time.sleep(0.2)
-        info = extract_company_info(company, details)
-        info["source"] = source
-        companies_info.append(info)
-
-    # ── Filtres côté serveur ───────────────────────────────────────────────
-    companies_info = _filter_ca(companies_info, args.ca_min, args.ca_max)
-    companies_info = _filter_effectif(companies_info, args.effectif_min, args.effectif_max)
-    companies_info = _filter_resultat_net(companies_info, args.resultat_net_min, args.resultat_net_max)
-    companies_info = _filter_age_dirigeant(companies_info, args.age_min_dirigeant)
-    companies_info = companies_info[:user_max]
-
+    # Les fiches déjà en cache sont lues directement, sans passer par le pool.
+    futures = []
+    for c in companies_raw:
+        if not (use_pappers and c.get("siren")):
+            futures.append(None)
+            continue
+        cached = cached_company_details(c["siren"])
+        if cached is None:
+            cached = _DETAILS_POOL.submit(get_company_details, c["siren"])
+        futures.append(cached)
+
+    # ── Extraction + filtres côté serveur + nettoyage, en une passe ────────
+    keep = _search_filter(args)
+
+    def pipeline():
+        """Extraction, filtres et nettoyage en une seule passe."""
+        for company, future in zip(companies_raw, futures):
+            details = {}
+            if isinstance(future, dict):
+                details = future
+            elif future is not None:
+                try:
+                    details = future.result()
+                except Exception:
+                    # Un échec isolé ne doit pas faire échouer toute la recherche
+                    details = {}
+            info = extract_company_info(company, details)
+            if keep is None or keep(info):
+                info["source"] = source
+                yield _clean_row(info)
+
+    clean = list(islice(pipeline(), user_max))
+
+    # Résultats suffisants : inutile d'attendre les détails restants
+    submitted = [f for f in futures if isinstance(f, Future)]
+    for future in submitted:
+        future.cancel()
+    # Appels HTTP réellement lancés : les fiches servies par le cache ne comptent pas
+    pappers_detail_calls = sum(1 for f in submitted if not f.cancelled())
     pappers_calls_total = pappers_search_calls + pappers_detail_calls
 
-    # ── Nettoyage + données Fullenrich ─────────────────────────────────────
-    clean = []
-    for c in companies_info:
-        row = {k: v for k, v in c.items() if not k.startswith("_")}
-        if c.get("_prenom") or c.get("_nom"):
-            row["_enrich"] = {
-                "prenom": c.get("_prenom", ""),
-                "nom": c.get("_nom", ""),
-                "domain": c.get("_domaine", ""),
-                "company_name": c.get("_nom_entreprise_raw", ""),
-            }
-        clean.append(row)
-
     return jsonify({
         "results": clean,
         "total": len(clean),
@@ -434,22 +571,13 @@ def api_export():
     data = request.get_json(silent=True) or {}
     results = data.get("results", [])
 
-    output = io.StringIO()
-    writer = csv.DictWriter(
-        output, fieldnames=CSV_FIELDS, delimiter=";", extrasaction="ignore"
+    return Response(
+        stream_with_context(_iter_csv(CSV_FIELDS, results)),
+        content_type="text/csv; charset=utf-8",
+        headers={
+            "Content-Disposition": f"attachment; filename=entreprises_{int(time.time())}.csv",
+        },
     )
-    writer.writeheader()
-    writer.writerows(results)
-
-    # UTF-8 BOM pour Excel
-    csv_bytes = ("\ufeff" + output.getvalue()).encode("utf-8")
-
-    response = make_response(csv_bytes)
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    response.headers["Content-Disposition"] = (
-        f"attachment; filename=entreprises_{int(time.time())}.csv"
-    )
-    return response
 
 
 # ---------------------------------------------------------------------------
@@ -457,20 +585,41 @@ def api_export():
 # ---------------------------------------------------------------------------
 
 
+# Solde Fullenrich mis en cache : (balance, expiration monotonic)
+CREDITS_CACHE_TTL = 30
+_credits_cache = (None, 0.0)
+
+
+def _invalidate_credits():
+    global _credits_cache
+    _credits_cache = (None, 0.0)
+
+
 @app.route("/api/fullenrich/credits", methods=["GET"])
 @login_required
 def api_fullenrich_credits():
-    """Retourne le solde de crédits Fullenrich."""
-    try:
-        resp = requests.get(
-            f"{FULLENRICH_BASE_URL}/account/credits",
-            headers={"Authorization": f"Bearer {_fullenrich_key()}"},
-            timeout=15,
-        )
-        resp.raise_for_status()
-        return jsonify({"balance": resp.json().get("balance")})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 502
+    """Retourne le solde de crédits Fullenrich (cache CREDITS_CACHE_TTL s + ETag)."""
+    global _credits_cache
+    balance, expires = _credits_cache
+    if time.monotonic() >= expires:
+        try:
+            resp = _FE_SESSION.get(
+                f"{FULLENRICH_BASE_URL}/account/credits",
+                timeout=15,
+            )
+            resp.raise_for_status()
+            balance = resp.json().get("balance")
+        except Exception as e:
+            return jsonify({"error": str(e)}), 502
+        _credits_cache = (balance, time.monotonic() + CREDITS_CACHE_TTL)
+
+    # no-cache : le navigateur revalide à chaque fois (304 si inchangé),
+    # pour afficher le bon solde juste après un enrichissement.
+    response = jsonify({"balance": balance})
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route("/api/fullenrich/enrich", methods=["POST"])
@@ -500,24 +649,27 @@ def api_fullenrich_enrich():
         return jsonify({"error": f"Erreur Fullenrich : {str(e)}"}), 502
 
 
+# enrich_type → champs demandés à Fullenrich (tuples partagés par tous les contacts)
+_FE_ENRICH_FIELDS = {
+    "email": ("contact.emails",),
+    "phone": ("contact.phones",),
+    "both":  FULLENRICH_ENRICH_FIELDS,
+}
+
+
 def _do_fullenrich_enrich(contacts: list[dict], enrich_type: str = "both") -> dict:
     """
     Soumet les contacts en bulk à Fullenrich, poll jusqu'à FINISHED.
+    Au-delà de FULLENRICH_BATCH_SIZE contacts, l'envoi est découpé en lots
+    soumis et suivis en parallèle ; les index restent ceux de `contacts`.
     contacts : [{prenom, nom, domain, company_name}, ...]
     enrich_type : "both" | "email" | "phone"
-    Retourne : {enriched: [{index, email, mobile}], credits_used, total_submitted}
+    Retourne : {enriched: [{index, email, mobile}], failed: [{index, count, error}],
+                credits_used, total_submitted}
+    Si certains lots échouent, les résultats des autres sont renvoyés et les lots en
+    échec listés dans `failed` ; si tous échouent, l'erreur du premier est levée.
     """
-    if enrich_type == "email":
-        enrich_fields = ["contact.emails"]
-    elif enrich_type == "phone":
-        enrich_fields = ["contact.phones"]
-    else:
-        enrich_fields = ["contact.emails", "contact.phones"]
-
-    auth_headers = {
-        "Authorization": f"Bearer {_fullenrich_key()}",
-        "Content-Type": "application/json",
-    }
+    enrich_fields = _FE_ENRICH_FIELDS.get(enrich_type, FULLENRICH_ENRICH_FIELDS)
 
     # Construction du payload
     payload_data = []
@@ -553,26 +705,81 @@ def _do_fullenrich_enrich(contacts: list[dict], enrich_type: str = "both") -> di
             entry["linkedin_url"] = linkedin_url
         payload_data.append(entry)
 
+    offsets = range(0, len(payload_data), FULLENRICH_BATCH_SIZE)
+    batches = [payload_data[i:i + FULLENRICH_BATCH_SIZE] for i in offsets]
+
+    def run(batch):
+        """(réponse, None) si le lot aboutit, (None, exception) sinon."""
+        try:
+            return _fullenrich_run_batch(batch), None
+        except Exception as e:
+            return None, e
+
+    try:
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(batches), FULLENRICH_MAX_PARALLEL)) as pool:
+                outcomes = list(pool.map(run, batches))
+        else:
+            outcomes = [run(b) for b in batches]
+    finally:
+        # Des crédits ont pu être consommés : le solde en cache n'est plus fiable
+        _invalidate_credits()
+
+    # Aucun lot abouti : même erreur qu'un envoi unique
+    if all(result is None for result, _ in outcomes):
+        raise outcomes[0][1]
+
+    enriched = []
+    failed = []
+    credits_used = 0
+    for offset, batch, (result, error) in zip(offsets, batches, outcomes):
+        if result is None:
+            # Lot en échec : les autres lots, déjà facturés, sont tout de même renvoyés
+            failed.append({"index": offset, "count": len(batch), "error": str(error)})
+            continue
+        for i, record in enumerate(result.get("data", [])):
+            contact_info = record.get("contact_info") or {}
+            email = (
+                (contact_info.get("most_probable_work_email") or {}).get("email")
+                or (contact_info.get("most_probable_personal_email") or {}).get("email")
+                or ""
+            )
+            mobile = (contact_info.get("most_probable_phone") or {}).get("number", "")
+            enriched.append({"index": offset + i, "email": email, "mobile": mobile})
+        credits_used += result.get("cost", {}).get("credits", 0)
+    return {
+        "enriched": enriched,
+        "failed": failed,
+        "credits_used": credits_used,
+        "total_submitted": len(contacts),
+    }
+
+
+def _fullenrich_run_batch(payload_data: list[dict]) -> dict:
+    """Soumet un lot à Fullenrich et poll jusqu'à FINISHED. Retourne la réponse finale."""
     # Soumission
-    resp = requests.post(
+    resp = _FE_SESSION.post(
         f"{FULLENRICH_BASE_URL}/contact/enrich/bulk",
         json={"name": f"web-{int(time.time())}", "data": payload_data},
-        headers=auth_headers,
         timeout=30,
     )
     resp.raise_for_status()
-    enrichment_id = resp.json().get("enrichment_id") or resp.json().get("id", "")
+    body = resp.json()
+    enrichment_id = body.get("enrichment_id") or body.get("id", "")
     if not enrichment_id:
         raise ValueError("Pas d'identifiant d'enrichissement reçu.")
 
     # Polling
-    for _ in range(FULLENRICH_POLL_MAX):
-        time.sleep(FULLENRICH_POLL_INTERVAL)
-        poll = requests.get(
+    retry_after = 0.0
+    for delay in fullenrich_poll_delays():
+        time.sleep(max(delay, retry_after))
+        poll = _FE_SESSION.get(
             f"{FULLENRICH_BASE_URL}/contact/enrich/bulk/{enrichment_id}",
-            headers={"Authorization": f"Bearer {_fullenrich_key()}"},
             timeout=30,
         )
+        retry_after = retry_after_seconds(poll)
+        if poll.status_code == 429:
+            continue
         if poll.status_code == 402:
             raise ValueError("Crédits Fullenrich insuffisants (402).")
         if 400 <= poll.status_code < 500:
@@ -583,21 +790,7 @@ def _do_fullenrich_enrich(contacts: list[dict], enrich_type: str = "both") -> di
         status = result.get("status", "UNKNOWN").upper()
 
         if status == "FINISHED":
-            enriched = []
-            for i, record in enumerate(result.get("data", [])):
-                contact_info = record.get("contact_info") or {}
-                email = (
-                    (contact_info.get("most_probable_work_email") or {}).get("email")
-                    or (contact_info.get("most_probable_personal_email") or {}).get("email")
-                    or ""
-                )
-                mobile = (contact_info.get("most_probable_phone") or {}).get("number", "")
-                enriched.append({"index": i, "email": email, "mobile": mobile})
-            return {
-                "enriched": enriched,
-                "credits_used": result.get("cost", {}).get("credits", 0),
-                "total_submitted": len(contacts),
-            }
+            return result
 
         if status in ("CANCELED", "CREDITS_INSUFFICIENT", "RATE_LIMIT"):
             raise ValueError(f"Enrichissement interrompu : {status}")
@@ -609,17 +802,10 @@ def _do_fullenrich_enrich(contacts: list[dict], enrich_type: str = "both") -> di
 # Supabase
 # ---------------------------------------------------------------------------
 
-_supa = None
-
-
-def _supabase():
-    global _supa
-    if _supa is None:
-        url = os.environ.get("SUPABASE_URL", "")
-        key = os.environ.get("SUPABASE_KEY", "")
-        if url and key:
-            _supa = _mk_supabase(url, key)
-    return _supa
+# Client créé une fois au démarrage (None si Supabase n'est pas configuré)
+_SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+_SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
+_SUPA = _mk_supabase(_SUPABASE_URL, _SUPABASE_KEY) if _SUPABASE_URL and _SUPABASE_KEY else None
 
 
 # ---------------------------------------------------------------------------
@@ -630,7 +816,7 @@ def _supabase():
 @app.route("/vendeurs")
 @login_required
 def vendeurs_page():
-    return render_template("vendeurs.html")
+    return _static_page("vendeurs.html")
 
 
 # ---------------------------------------------------------------------------
@@ -648,7 +834,7 @@ VENDEUR_CSV_FIELDS = [
 @app.route("/api/vendeurs", methods=["GET"])
 @login_required
 def api_vendeurs_list():
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
@@ -661,38 +847,32 @@ def api_vendeurs_list():
 @app.route("/api/vendeurs/export", methods=["GET"])
 @login_required
 def api_vendeurs_export():
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
-        res = supa.table("vendeurs").select("*").order("created_at", desc=True).execute()
+        # Projection côté Supabase : seules les colonnes exportées transitent
+        res = (
+            supa.table("vendeurs")
+            .select(",".join(VENDEUR_CSV_FIELDS))
+            .order("created_at", desc=True)
+            .execute()
+        )
         vendeurs = res.data
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    output = io.StringIO()
-    writer = csv.DictWriter(
-        output, fieldnames=VENDEUR_CSV_FIELDS, delimiter=";", extrasaction="ignore"
-    )
-    writer.writeheader()
-    writer.writerows(vendeurs)
-    csv_bytes = ("\ufeff" + output.getvalue()).encode("utf-8")
-    response = make_response(csv_bytes)
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    response.headers["Content-Disposition"] = (
-        f"attachment; filename=vendeurs_{int(time.time())}.csv"
+    return Response(
+        stream_with_context(_iter_csv(VENDEUR_CSV_FIELDS, vendeurs)),
+        content_type="text/csv; charset=utf-8",
+        headers={
+            "Content-Disposition": f"attachment; filename=vendeurs_{int(time.time())}.csv",
+        },
     )
-    return response
 
 
-@app.route("/api/vendeurs", methods=["POST"])
-@login_required
-def api_vendeurs_create():
-    data = request.get_json(force=True)
-    supa = _supabase()
-    if not supa:
-        return jsonify({"error": "Supabase non configuré"}), 500
-
+def _vendeur_row(data: dict) -> dict:
+    """Ligne vendeurs à partir d'un résultat de recherche ou d'un formulaire (champs vides omis)."""
     row = {
         "nom_entreprise": data.get("nom_entreprise") or "",
         "siren":          data.get("siren") or "",
@@ -710,7 +890,18 @@ def api_vendeurs_create():
         "raison_cession": data.get("raison_cession") or "",
         "notes":          data.get("notes") or "",
     }
-    row = {k: v for k, v in row.items() if v is not None and v != ""}
+    return {k: v for k, v in row.items() if v is not None and v != ""}
+
+
+@app.route("/api/vendeurs", methods=["POST"])
+@login_required
+def api_vendeurs_create():
+    data = request.get_json(force=True)
+    supa = _SUPA
+    if not supa:
+        return jsonify({"error": "Supabase non configuré"}), 500
+
+    row = _vendeur_row(data)
 
     try:
         siren = row.get("siren")
@@ -727,11 +918,61 @@ def api_vendeurs_create():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/vendeurs/bulk", methods=["POST"])
+@login_required
+def api_vendeurs_bulk_create():
+    """
+    Ajoute plusieurs vendeurs en deux requêtes Supabase : une recherche des
+    SIREN déjà présents, puis une insertion groupée des autres.
+    Retourne : {inserted: [vendeur, ...], duplicates: [siren, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    raw = (data.get("rows") or []) if isinstance(data, dict) else None
+    if not isinstance(raw, list) or not all(isinstance(d, dict) for d in raw):
+        return jsonify({"error": "« rows » doit être une liste d'objets vendeur."}), 400
+    rows = [_vendeur_row(d) for d in raw if d]
+    if not rows:
+        return jsonify({"error": "Aucun vendeur fourni."}), 400
+
+    supa = _SUPA
+    if not supa:
+        return jsonify({"error": "Supabase non configuré"}), 500
+
+    try:
+        sirens = list({r["siren"] for r in rows if r.get("siren")})
+        existing = set()
+        if sirens:
+            res = supa.table("vendeurs").select("siren").in_("siren", sirens).execute()
+            existing = {v["siren"] for v in res.data or []}
+
+        to_insert, duplicates = [], []
+        for row in rows:
+            siren = row.get("siren")
+            if siren and siren in existing:
+                duplicates.append(siren)
+                continue
+            if siren:
+                existing.add(siren)   # doublon à l'intérieur du lot
+            to_insert.append(row)
+
+        inserted = []
+        if to_insert:
+            # L'insertion groupée exige les mêmes colonnes sur chaque ligne
+            columns = set().union(*to_insert)
+            res = supa.table("vendeurs").insert(
+                [{k: r.get(k) for k in columns} for r in to_insert]
+            ).execute()
+            inserted = res.data or []
+        return jsonify({"inserted": inserted, "duplicates": duplicates}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/vendeurs/<vid>", methods=["PATCH"])
 @login_required
 def api_vendeurs_update(vid):
     data = request.get_json(force=True)
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
@@ -753,7 +994,7 @@ def api_vendeurs_update(vid):
 @app.route("/api/vendeurs/<vid>", methods=["DELETE"])
 @login_required
 def api_vendeurs_delete(vid):
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
@@ -771,7 +1012,7 @@ def api_vendeurs_enrich(vid):
     if enrich_type not in ("both", "email", "phone"):
         enrich_type = "both"
 
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
@@ -782,9 +1023,11 @@ def api_vendeurs_enrich(vid):
         return jsonify({"error": f"Vendeur non trouvé : {e}"}), 404
 
     nom_full = (vendeur.get("nom_dirigeant") or "").strip()
-    parts = nom_full.split()
-    prenom = parts[0] if len(parts) >= 2 else ""
-    nom    = " ".join(parts[1:]) if len(parts) >= 2 else nom_full
+    prenom, sep, nom = nom_full.partition(" ")
+    if sep:
+        nom = nom.lstrip()
+    else:
+        prenom, nom = "", nom_full
 
     contacts = [{
         "prenom":       prenom,
@@ -825,7 +1068,7 @@ def api_vendeurs_enrich(vid):
 @app.route("/contacts")
 @login_required
 def contacts_page():
-    return render_template("contacts.html")
+    return _static_page("contacts.html")
 
 
 @app.route("/api/contacts/search", methods=["POST"])
@@ -897,13 +1140,9 @@ def api_contacts_search():
         return jsonify({"error": "Renseignez au moins un nom d'entreprise, un domaine ou un titre de poste."}), 400
 
     try:
-        resp = requests.post(
+        resp = _FE_SESSION.post(
             f"{FULLENRICH_BASE_URL}/people/search",
             json=payload,
-            headers={
-                "Authorization": f"Bearer {_fullenrich_key()}",
-                "Content-Type": "application/json",
-            },
             timeout=30,
         )
         resp.raise_for_status()
@@ -923,7 +1162,7 @@ def api_contacts_search():
 @app.route("/acheteurs")
 @login_required
 def acheteurs_page():
-    return render_template("acheteurs.html")
+    return _static_page("acheteurs.html")
 
 
 # ---------------------------------------------------------------------------
@@ -939,7 +1178,7 @@ ACHETEUR_CSV_FIELDS = [
 @app.route("/api/acheteurs", methods=["GET"])
 @login_required
 def api_acheteurs_list():
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
@@ -952,35 +1191,35 @@ def api_acheteurs_list():
 @app.route("/api/acheteurs/export", methods=["GET"])
 @login_required
 def api_acheteurs_export():
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
-        res = supa.table("acheteurs").select("*").order("created_at", desc=True).execute()
+        # Projection côté Supabase : seules les colonnes exportées transitent
+        res = (
+            supa.table("acheteurs")
+            .select(",".join(ACHETEUR_CSV_FIELDS))
+            .order("created_at", desc=True)
+            .execute()
+        )
         acheteurs = res.data
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    output = io.StringIO()
-    writer = csv.DictWriter(
-        output, fieldnames=ACHETEUR_CSV_FIELDS, delimiter=";", extrasaction="ignore"
-    )
-    writer.writeheader()
-    writer.writerows(acheteurs)
-    csv_bytes = ("\ufeff" + output.getvalue()).encode("utf-8")
-    response = make_response(csv_bytes)
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    response.headers["Content-Disposition"] = (
-        f"attachment; filename=acheteurs_{int(time.time())}.csv"
+    return Response(
+        stream_with_context(_iter_csv(ACHETEUR_CSV_FIELDS, acheteurs)),
+        content_type="text/csv; charset=utf-8",
+        headers={
+            "Content-Disposition": f"attachment; filename=acheteurs_{int(time.time())}.csv",
+        },
     )
-    return response
 
 
 @app.route("/api/acheteurs", methods=["POST"])
 @login_required
 def api_acheteurs_create():
     data = request.get_json(force=True)
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
@@ -1018,7 +1257,7 @@ def api_acheteurs_import():
     if not entreprises:
         return jsonify({"error": "Aucune entreprise fournie."}), 400
 
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
@@ -1035,7 +1274,7 @@ def api_acheteurs_import():
 @login_required
 def api_acheteurs_update(aid):
     data = request.get_json(force=True)
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
@@ -1058,7 +1297,7 @@ def api_acheteurs_update(aid):
 @app.route("/api/acheteurs/<aid>", methods=["DELETE"])
 @login_required
 def api_acheteurs_delete(aid):
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
     try:
@@ -1076,7 +1315,7 @@ def api_acheteurs_enrich(aid):
     if enrich_type not in ("both", "email", "phone"):
         enrich_type = "both"
 
-    supa = _supabase()
+    supa = _SUPA
     if not supa:
         return jsonify({"error": "Supabase non configuré"}), 500
 
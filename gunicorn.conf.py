@@ -0,0 +1,16 @@
+"""
+gunicorn.conf.py — Configuration du serveur de production (Procfile, Railway).
+
+Un seul worker multi-thread par défaut : les appels Pappers / Fullenrich sont
+des attentes réseau que les threads recouvrent, et les caches en mémoire
+(détails SIREN, pages rendues) restent partagés entre les requêtes.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = 120
+preload_app = True
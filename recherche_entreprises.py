@@ -12,15 +12,25 @@ Usage :
 
 import argparse
 import csv
+import math
 import os
 import re
+import sqlite3
 import sys
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 
 import unicodedata
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
 # ---------------------------------------------------------------------------
 # Correspondance noms de régions → codes INSEE (paramètre `region` de l'API Pappers)
@@ -48,34 +58,42 @@ REGIONS_INSEE: dict[str, str] = {
     "corse": "94",
 }
 
+# Code NAF saisi directement (ex : "4322A") et séparateurs de slug Pappers
+_NAF_RE = re.compile(r"^\d{4}[A-Za-z]$")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
 
 def _normalize(s: str) -> str:
     """Supprime les accents et met en minuscules pour la correspondance."""
-    return unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode().lower().strip()
+    if not s.isascii():
+        s = unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode()
+    return s.lower().strip()
 
 
 def _slugify(s: str) -> str:
     """Génère un slug URL à partir d'un nom d'entreprise (style Pappers)."""
-    s = unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode()
+    # Chaîne déjà ASCII (cas le plus courant) : pas de décomposition NFD
+    if not s.isascii():
+        s = unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode()
     s = s.lower()
-    s = re.sub(r"[^a-z0-9]+", "-", s)
+    s = _SLUG_RE.sub("-", s)
     return s.strip("-")
 
 
+# Clés de REGIONS_INSEE normalisées une fois pour toutes (accents, casse)
+_REGIONS_NORMALIZED: dict[str, str] = {_normalize(k): v for k, v in REGIONS_INSEE.items()}
+
+
 def region_to_code(region: str) -> str:
     """
     Convertit un nom de région en code INSEE attendu par l'API Pappers.
     Si la valeur est déjà un code numérique, elle est renvoyée telle quelle.
     """
-    if region.strip().isdigit():
-        return region.strip()
-    normalized = _normalize(region)
-    # Cherche d'abord avec accents, puis sans
-    for key, code in REGIONS_INSEE.items():
-        if _normalize(key) == normalized:
-            return code
+    r = region.strip()
+    if r.isdigit():
+        return r
     # Retourne la valeur originale si non trouvée (laisse l'API gérer)
-    return region
+    return _REGIONS_NORMALIZED.get(_normalize(r), region)
 
 
 # ---------------------------------------------------------------------------
@@ -126,6 +144,67 @@ _DATAGOUV_TRANCHE_LABEL: dict[str, str] = {
 }
 FULLENRICH_BASE_URL = "https://app.fullenrich.com/api/v2"
 
+
+# ---------------------------------------------------------------------------
+# Sessions HTTP partagées (keep-alive : pas de nouvelle poignée de main TLS
+# à chaque appel). Les relances ne concernent que les méthodes idempotentes.
+# ---------------------------------------------------------------------------
+class _Retry(Retry):
+    """Retry urllib3 dont l'attente Retry-After est plafonnée à 60 s."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, 60.0)
+
+
+def _make_session(base_url: str, pool_maxsize: int = 16) -> requests.Session:
+    # 429 et 5xx transitoires : nouvelles tentatives avec backoff exponentiel et
+    # respect de Retry-After. Seulement pour les méthodes idempotentes (pas de
+    # POST : une soumission Fullenrich rejouée serait facturée deux fois) ; une
+    # fois les tentatives épuisées, la dernière réponse est renvoyée telle quelle.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        max_retries=_Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        ),
+    )
+    session.mount(base_url, adapter)
+    return session
+
+
+# Nombre d'appels Pappers /entreprise lancés en parallèle ; le pool de
+# connexions est dimensionné en conséquence pour garder chaque socket ouverte.
+PAPPERS_MAX_WORKERS = 8
+
+_PAPPERS_SESSION = _make_session(PAPPERS_BASE_URL, pool_maxsize=PAPPERS_MAX_WORKERS)
+_FE_SESSION = _make_session(FULLENRICH_BASE_URL)
+_DATAGOUV_SESSION = _make_session(DATAGOUV_BASE_URL)
+
+
+class _FullenrichAuth(AuthBase):
+    """En-tête Bearer Fullenrich posé par la session (clé relue à chaque appel)."""
+
+    def __call__(self, r):
+        r.headers["Authorization"] = f"Bearer {_fullenrich_key()}"
+        return r
+
+
+_FE_SESSION.auth = _FullenrichAuth()
+
+
+def _json(resp: requests.Response):
+    """Décode le corps JSON d'une réponse avec orjson (erreur → RequestException, comme resp.json())."""
+    try:
+        return orjson.loads(resp.content)
+    except orjson.JSONDecodeError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=resp) from e
+
+
 # ---------------------------------------------------------------------------
 # Paramètres par défaut
 # ---------------------------------------------------------------------------
@@ -133,10 +212,69 @@ DEFAULT_MAX_RESULTATS = 100
 DEFAULT_MAX_ENRICHISSEMENTS = 10
 OUTPUT_DIR = "resultats"
 
-# Délai entre les appels Pappers (secondes) pour respecter le rate limit
-PAPPERS_DELAY = 0.4
+# Débit max des appels Pappers (requêtes/seconde) pour respecter le rate limit
+PAPPERS_RATE = 5
 FULLENRICH_POLL_INTERVAL = 4   # secondes entre chaque polling
 FULLENRICH_POLL_MAX = 40        # nombre max de tentatives de polling
+FULLENRICH_POLL_BACKOFF = 1.5   # facteur d'allongement du délai entre deux pollings
+FULLENRICH_POLL_MAX_DELAY = 8   # délai max entre deux pollings (secondes)
+FULLENRICH_BATCH_SIZE = 100     # contacts max par soumission bulk
+FULLENRICH_MAX_PARALLEL = 4     # lots bulk soumis et suivis en parallèle
+FULLENRICH_ENRICH_FIELDS = ("contact.emails", "contact.phones")
+DETAILS_CACHE_MAX = 4096        # nombre max de fiches /entreprise gardées en mémoire
+DETAILS_CACHE_TTL = 3600        # durée de validité d'une fiche en cache (secondes)
+DETAILS_DISK_CACHE = ".pappers_cache.sqlite"  # cache disque des fiches (CLI, désactivable par --no-cache)
+DETAILS_DISK_CACHE_TTL = 24 * 3600             # durée de validité d'une fiche sur disque (secondes)
+
+
+class _TokenBucket:
+    """
+    Limiteur de débit partagé entre threads : `rate` jetons/seconde, rafale max
+    `capacity`. acquire() ne bloque que si le débit est réellement dépassé.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Le jeton est réservé tout de suite (solde éventuellement négatif) :
+            # les appelants suivants attendent d'autant plus longtemps.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+_pappers_limiter = _TokenBucket(PAPPERS_RATE, capacity=PAPPERS_MAX_WORKERS)
+
+
+def fullenrich_poll_delays():
+    """
+    Délais successifs entre deux pollings Fullenrich : 1 s, 1,5 s, 2,25 s…
+    plafonnés à FULLENRICH_POLL_MAX_DELAY. L'attente totale reste celle de
+    FULLENRICH_POLL_MAX × FULLENRICH_POLL_INTERVAL.
+    """
+    budget = FULLENRICH_POLL_MAX * FULLENRICH_POLL_INTERVAL
+    delay = 1.0
+    while budget > 0:
+        step = min(delay, budget)
+        yield step
+        budget -= step
+        delay = min(delay * FULLENRICH_POLL_BACKOFF, FULLENRICH_POLL_MAX_DELAY)
+
+
+def retry_after_seconds(resp: requests.Response) -> float:
+    """Délai demandé par l'en-tête Retry-After, en secondes (plafonné à 60 s) ; 0 si absent."""
+    value = resp.headers.get("Retry-After", "").strip()
+    return min(float(value), 60.0) if value.isdigit() else 0.0
 
 
 # ---------------------------------------------------------------------------
@@ -207,6 +345,14 @@ Exemples :
         metavar="FICHIER.csv",
         help="Chemin du fichier CSV de sortie (défaut: resultats/resultats_YYYYMMDD_HHMMSS.csv)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=(
+            f"Ne pas utiliser le cache disque des fiches Pappers ({DETAILS_DISK_CACHE}, "
+            f"valable {DETAILS_DISK_CACHE_TTL // 3600} h) : toutes les fiches sont rechargées."
+        ),
+    )
     return parser.parse_args()
 
 
@@ -222,6 +368,7 @@ def normalize_datagouv_company(company_dg: dict) -> dict:
     siege_dg = company_dg.get("siege") or {}
 
     dirigeants = []
+    annee_courante = datetime.now().year
     for d in (company_dg.get("dirigeants") or []):
         # Utiliser type_dirigeant (plus fiable que tester la présence de "denomination")
         is_pm = d.get("type_dirigeant") == "personne morale"
@@ -236,7 +383,7 @@ def normalize_datagouv_company(company_dg: dict) -> dict:
             annee = d.get("annee_de_naissance") or ""
             if annee:
                 try:
-                    entry["age"] = datetime.now().year - int(annee)
+                    entry["age"] = annee_courante - int(annee)
                 except (ValueError, TypeError):
                     pass
         dirigeants.append(entry)
@@ -295,7 +442,7 @@ def search_datagouv(args) -> tuple[list[dict], int]:
 
     params: dict = {}
     secteur = getattr(args, 'secteur', '') or ''
-    is_naf = bool(secteur) and bool(re.match(r"^\d{4}[A-Za-z]$", secteur.strip()))
+    is_naf = bool(secteur) and bool(_NAF_RE.match(secteur.strip()))
 
     q_parts: list[str] = []
 
@@ -363,13 +510,9 @@ def search_datagouv(args) -> tuple[list[dict], int]:
         params["page"] = page
 
         try:
-            resp = requests.get(DATAGOUV_BASE_URL, params=params, timeout=15)
-            if resp.status_code == 429:
-                retry_after = int(resp.headers.get("Retry-After", 2))
-                time.sleep(retry_after)
-                resp = requests.get(DATAGOUV_BASE_URL, params=params, timeout=15)
+            resp = _DATAGOUV_SESSION.get(DATAGOUV_BASE_URL, params=params, timeout=15)
             resp.raise_for_status()
-            data = resp.json()
+            data = _json(resp)
         except requests.exceptions.HTTPError as e:
             raise RuntimeError(
                 f"API data.gouv.fr erreur {e.response.status_code}: {e.response.text[:200]}"
@@ -405,109 +548,125 @@ def search_pappers(args: argparse.Namespace) -> tuple[list[dict], int]:
     Retourne la liste brute des entreprises (format Pappers).
     """
     print("\nRecherche Pappers en cours...")
+    if args.max_resultats <= 0:
+        return [], 0
 
     companies: list[dict] = []
-    total_pappers: int = 0
-    page = 1
     par_page = min(100, args.max_resultats)
 
     # Déterminer si --secteur est un code NAF (format DDDDL, ex: 4322A)
     secteur = getattr(args, 'secteur', '') or ''
-    is_naf = bool(secteur) and bool(re.match(r"^\d{4}[A-Za-z]$", secteur.strip()))
+    is_naf = bool(secteur) and bool(_NAF_RE.match(secteur.strip()))
 
-    while len(companies) < args.max_resultats:
-        params: dict = {
-            "api_token": _pappers_key(),
-            "par_page": par_page,
-            "page": page,
-        }
+    # Paramètres communs à toutes les pages
+    params: dict = {
+        "api_token": _pappers_key(),
+        "par_page": par_page,
+    }
 
-        entreprise_cessee = getattr(args, 'entreprise_cessee', False)
-        params["entreprise_cessee"] = "true" if entreprise_cessee else "false"
-
-        if secteur:
-            if is_naf:
-                params["code_naf"] = secteur.strip().upper()
-            else:
-                q_parts = [secteur.strip()]
-                ville = getattr(args, 'ville', None)
-                if ville:
-                    q_parts.append(ville.strip())
-                params["q"] = " ".join(q_parts)
-        elif getattr(args, 'ville', None):
-            params["q"] = args.ville.strip()
-
-        if args.region:
-            params["region"] = region_to_code(args.region)
-        if args.ca_min:
-            params["chiffre_affaires_min"] = args.ca_min
-        if args.ca_max:
-            params["chiffre_affaires_max"] = args.ca_max
-        if args.age_min_dirigeant:
-            params["age_dirigeant_min"] = args.age_min_dirigeant
-
-        departement = getattr(args, 'departement', None)
-        if departement:
-            params["departement"] = departement.strip()
-
-        categorie_juridique = getattr(args, 'categorie_juridique', None)
-        if categorie_juridique:
-            params["categorie_juridique"] = categorie_juridique
-
-        date_creation_min = getattr(args, 'date_creation_min', None)
-        if date_creation_min:
-            params["date_creation_min"] = f"{date_creation_min}-01-01"
-
-        statut_rcs = getattr(args, 'statut_rcs', None)
-        if statut_rcs:
-            params["statut_rcs"] = statut_rcs
-
-        nom_entreprise = getattr(args, 'nom_entreprise', None)
-        if nom_entreprise:
-            params["denomination"] = nom_entreprise.strip()
-
-        nom_dirigeant = getattr(args, 'nom_dirigeant', None)
-        if nom_dirigeant:
-            params["nom_dirigeant"] = nom_dirigeant.strip()
-
-        prenom_dirigeant = getattr(args, 'prenom_dirigeant', None)
-        if prenom_dirigeant:
-            params["prenom_dirigeant"] = prenom_dirigeant.strip()
+    entreprise_cessee = getattr(args, 'entreprise_cessee', False)
+    params["entreprise_cessee"] = "true" if entreprise_cessee else "false"
 
-        try:
-            resp = requests.get(
-                f"{PAPPERS_BASE_URL}/recherche",
-                params=params,
-                timeout=30,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-        except requests.exceptions.HTTPError as e:
+    if secteur:
+        if is_naf:
+            params["code_naf"] = secteur.strip().upper()
+        else:
+            q_parts = [secteur.strip()]
+            ville = getattr(args, 'ville', None)
+            if ville:
+                q_parts.append(ville.strip())
+            params["q"] = " ".join(q_parts)
+    elif getattr(args, 'ville', None):
+        params["q"] = args.ville.strip()
+
+    if args.region:
+        params["region"] = region_to_code(args.region)
+    if args.ca_min:
+        params["chiffre_affaires_min"] = args.ca_min
+    if args.ca_max:
+        params["chiffre_affaires_max"] = args.ca_max
+    if args.age_min_dirigeant:
+        params["age_dirigeant_min"] = args.age_min_dirigeant
+
+    departement = getattr(args, 'departement', None)
+    if departement:
+        params["departement"] = departement.strip()
+
+    categorie_juridique = getattr(args, 'categorie_juridique', None)
+    if categorie_juridique:
+        params["categorie_juridique"] = categorie_juridique
+
+    date_creation_min = getattr(args, 'date_creation_min', None)
+    if date_creation_min:
+        params["date_creation_min"] = f"{date_creation_min}-01-01"
+
+    statut_rcs = getattr(args, 'statut_rcs', None)
+    if statut_rcs:
+        params["statut_rcs"] = statut_rcs
+
+    nom_entreprise = getattr(args, 'nom_entreprise', None)
+    if nom_entreprise:
+        params["denomination"] = nom_entreprise.strip()
+
+    nom_dirigeant = getattr(args, 'nom_dirigeant', None)
+    if nom_dirigeant:
+        params["nom_dirigeant"] = nom_dirigeant.strip()
+
+    prenom_dirigeant = getattr(args, 'prenom_dirigeant', None)
+    if prenom_dirigeant:
+        params["prenom_dirigeant"] = prenom_dirigeant.strip()
+
+    def fetch(page: int) -> dict:
+        _pappers_limiter.acquire()
+        resp = _PAPPERS_SESSION.get(
+            f"{PAPPERS_BASE_URL}/recherche",
+            params={**params, "page": page},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return _json(resp)
+
+    def report(e: requests.exceptions.RequestException) -> None:
+        if isinstance(e, requests.exceptions.HTTPError):
             print(f"  Erreur HTTP Pappers ({e.response.status_code}): {e.response.text[:200]}")
-            break
-        except requests.exceptions.RequestException as e:
+        else:
             print(f"  Erreur réseau Pappers : {e}")
-            break
 
+    def add(page: int, data: dict) -> bool:
+        """Ajoute une page de résultats ; False si la pagination est terminée."""
         results: list[dict] = data.get("resultats", [])
-        total: int = data.get("total", 0)
-
-        if page == 1:
-            total_pappers = total
-            print(f"  {total} entreprise(s) trouvée(s) au total (on récupère max {args.max_resultats})")
-
         if not results:
-            break
-
+            return False
         companies.extend(results)
-        remaining = min(total, args.max_resultats) - len(companies)
-        print(f"  Page {page} : {len(results)} entreprises récupérées ({len(companies)}/{min(total, args.max_resultats)})")
-
-        if remaining <= 0 or len(results) < par_page:
-            break
+        print(f"  Page {page} : {len(results)} entreprises récupérées ({len(companies)}/{wanted})")
+        return len(results) >= par_page and len(companies) < wanted
 
-        page += 1
-        time.sleep(PAPPERS_DELAY)
+    # Page 1 seule, pour connaître le total
+    try:
+        first = fetch(1)
+    except requests.exceptions.RequestException as e:
+        report(e)
+        return [], 0
+
+    total_pappers: int = first.get("total", 0)
+    print(f"  {total_pappers} entreprise(s) trouvée(s) au total (on récupère max {args.max_resultats})")
+    wanted = min(total_pappers, args.max_resultats)
+
+    # Pages suivantes en parallèle (débit borné par le limiteur PAPPERS_RATE),
+    # traitées dans l'ordre
+    n_pages = math.ceil(wanted / par_page)
+    if add(1, first) and n_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(PAPPERS_MAX_WORKERS, n_pages - 1)) as pool:
+            futures = [pool.submit(fetch, page) for page in range(2, n_pages + 1)]
+            for page, future in enumerate(futures, 2):
+                try:
+                    if not add(page, future.result()):
+                        break
+                except requests.exceptions.RequestException as e:
+                    report(e)
+                    break
+            for future in futures:
+                future.cancel()
 
     return companies[: args.max_resultats], total_pappers
 
@@ -515,19 +674,137 @@ def search_pappers(args: argparse.Namespace) -> tuple[list[dict], int]:
 # ---------------------------------------------------------------------------
 # Pappers — Détail entreprise
 # ---------------------------------------------------------------------------
+# SIREN → (expiration monotonic, détails)
+_details_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_details_lock = threading.Lock()
+
+# Cache disque SQLite (siren, horodatage, JSON) ; activé par la CLI via
+# enable_details_disk_cache(), absent côté web (cache mémoire seulement).
+_disk_cache: sqlite3.Connection | None = None
+_disk_lock = threading.Lock()
+
+
+def enable_details_disk_cache(path: str = DETAILS_DISK_CACHE) -> None:
+    """Active le cache disque des fiches /entreprise (DETAILS_DISK_CACHE_TTL secondes)."""
+    global _disk_cache
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS details (siren TEXT PRIMARY KEY, ts INTEGER, body TEXT)"
+    )
+    conn.commit()
+    _disk_cache = conn
+
+
+def _disk_get(siren: str) -> dict | None:
+    if _disk_cache is None:
+        return None
+    try:
+        with _disk_lock:
+            row = _disk_cache.execute(
+                "SELECT body FROM details WHERE siren = ? AND ts > ?",
+                (siren, int(time.time()) - DETAILS_DISK_CACHE_TTL),
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+    except (sqlite3.Error, orjson.JSONDecodeError):
+        # Ligne illisible ou corrompue : traitée comme absente du cache
+        return None
+
+
+def _disk_put(siren: str, details: dict) -> None:
+    if _disk_cache is None:
+        return
+    body = orjson.dumps(details).decode()
+    try:
+        with _disk_lock:
+            _disk_cache.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?)",
+                (siren, int(time.time()), body),
+            )
+            _disk_cache.commit()
+    except sqlite3.Error:
+        pass
+
+
+def _remember(siren: str, details: dict) -> None:
+    """Ajoute une fiche au cache mémoire (LRU borné à DETAILS_CACHE_MAX)."""
+    with _details_lock:
+        _details_cache[siren] = (time.monotonic() + DETAILS_CACHE_TTL, details)
+        _details_cache.move_to_end(siren)
+        if len(_details_cache) > DETAILS_CACHE_MAX:
+            _details_cache.popitem(last=False)
+
+
+def cached_company_details(siren: str) -> dict | None:
+    """Fiche /entreprise déjà en cache (mémoire puis disque), sans appel réseau ; None sinon."""
+    with _details_lock:
+        cached = _details_cache.get(siren)
+        if cached is not None:
+            expires, details = cached
+            if time.monotonic() < expires:
+                _details_cache.move_to_end(siren)
+                return details
+            del _details_cache[siren]
+
+    details = _disk_get(siren)
+    if details is not None:
+        _remember(siren, details)
+    return details
+
+
 def get_company_details(siren: str) -> dict:
-    """Récupère le détail complet d'une entreprise via son SIREN."""
+    """
+    Récupère le détail complet d'une entreprise via son SIREN.
+    Les réponses valides sont gardées en cache (LRU, DETAILS_CACHE_MAX entrées,
+    DETAILS_CACHE_TTL secondes, plus le cache disque s'il est activé) ;
+    les échecs ne sont pas mis en cache.
+    """
+    details = cached_company_details(siren)
+    if details is not None:
+        return details
+
     try:
-        resp = requests.get(
+        _pappers_limiter.acquire()
+        resp = _PAPPERS_SESSION.get(
             f"{PAPPERS_BASE_URL}/entreprise",
             params={"api_token": _pappers_key(), "siren": siren},
             timeout=30,
         )
         resp.raise_for_status()
-        return resp.json()
+        details = _json(resp)
     except requests.exceptions.RequestException:
         return {}
 
+    if details:
+        _remember(siren, details)
+        _disk_put(siren, details)
+    return details
+
+
+def _needs_details(company: dict) -> bool:
+    """
+    Indique si le résultat /recherche est incomplet et qu'il faut appeler /entreprise.
+    Le détail n'est évité que si le résultat fournit chaque champ qu'extract_company_info
+    irait sinon chercher dans /entreprise : adresse, site, secteur, CA, résultat,
+    effectifs_finances (seule source d'effectif prioritaire sur le détail, y compris
+    pour _effectifs_finances) et un dirigeant personne physique avec âge ou naissance.
+    Dans ce cas, adresse, site et dirigeant proviennent du résultat /recherche.
+    """
+    if not (company.get("siege") and company.get("domaine_url") and company.get("libelle_code_naf")):
+        return True
+    if not company.get("chiffre_affaires") or company.get("resultat_net") is None:
+        return True
+    if not company.get("effectifs_finances"):
+        return True
+    dirigeant = next(
+        (d for d in company.get("dirigeants") or [] if d and not d.get("personne_morale")),
+        None,
+    )
+    return not (
+        dirigeant
+        and (dirigeant.get("age") or dirigeant.get("date_de_naissance")
+             or dirigeant.get("date_de_naissance_formate"))
+    )
+
 
 # ---------------------------------------------------------------------------
 # Extraction des informations utiles
@@ -561,17 +838,15 @@ def extract_company_info(company: dict, details: dict) -> dict:
     # --- Finances ---
     # data.gouv.fr expose ca/resultat_net à la racine (via normalize_datagouv_company) ;
     # Pappers les met dans finances[0]. On prend la valeur la plus riche disponible.
-    finances0 = (details.get("finances") or [{}])[0]
+    finances0 = (details.get("finances") or [None])[0] or {}
     ca = (
         company.get("chiffre_affaires")
         or finances0.get("chiffre_affaires")
         or ""
     )
-    resultat_net = (
-        company.get("resultat_net")
-        if company.get("resultat_net") is not None
-        else (finances0.get("resultat") if finances0 else None)
-    )
+    resultat_net = company.get("resultat_net")
+    if resultat_net is None:
+        resultat_net = finances0.get("resultat")
     secteur = (
         company.get("libelle_code_naf")
         or details.get("libelle_code_naf")
@@ -607,14 +882,11 @@ def extract_company_info(company: dict, details: dict) -> dict:
         or company.get("dirigeants")
         or []
     ) if d]
-    dirigeant: dict = {}
-    for d in dirigeants:
-        # Ignorer les personnes morales (filiales, holdings)
-        if not d.get("personne_morale", False):
-            dirigeant = d
-            break
-    if not dirigeant and dirigeants:
-        dirigeant = dirigeants[0]
+    # Ignorer les personnes morales (filiales, holdings), sauf s'il n'y a qu'elles
+    dirigeant: dict = next(
+        (d for d in dirigeants if not d.get("personne_morale", False)),
+        dirigeants[0] if dirigeants else {},
+    )
 
     nom_dirigeant = ""
     age_dirigeant = ""
@@ -631,15 +903,16 @@ def extract_company_info(company: dict, details: dict) -> dict:
         if not age_dirigeant:
             # Tenter de calculer depuis date_de_naissance (YYYY-MM-DD) ou
             # date_de_naissance_formate (DD/MM/YYYY)
-            dob = dirigeant.get("date_de_naissance", "") or dirigeant.get("date_de_naissance_formate", "")
+            dob = dirigeant.get("date_de_naissance") or dirigeant.get("date_de_naissance_formate")
             if dob:
+                dob = str(dob)
                 try:
                     # Format YYYY-MM-DD
-                    if "-" in str(dob):
-                        birth_year = int(str(dob).split("-")[0])
+                    if "-" in dob:
+                        birth_year = int(dob.partition("-")[0])
                     else:
                         # Format DD/MM/YYYY
-                        birth_year = int(str(dob).split("/")[-1])
+                        birth_year = int(dob.rpartition("/")[2])
                     age_dirigeant = datetime.now().year - birth_year
                 except (ValueError, IndexError):
                     pass
@@ -687,13 +960,12 @@ def extract_company_info(company: dict, details: dict) -> dict:
 def get_fullenrich_credits() -> int | None:
     """Retourne le solde de crédits Fullenrich, ou None en cas d'erreur."""
     try:
-        resp = requests.get(
+        resp = _FE_SESSION.get(
             f"{FULLENRICH_BASE_URL}/account/credits",
-            headers={"Authorization": f"Bearer {_fullenrich_key()}"},
             timeout=15,
         )
         resp.raise_for_status()
-        return resp.json().get("balance")
+        return _json(resp).get("balance")
     except requests.exceptions.RequestException:
         return None
 
@@ -701,6 +973,74 @@ def get_fullenrich_credits() -> int | None:
 # ---------------------------------------------------------------------------
 # Fullenrich — Enrichissement en masse
 # ---------------------------------------------------------------------------
+def _fullenrich_bulk(name: str, payload_data: list[dict], prefix: str) -> dict | None:
+    """
+    Soumet un lot de contacts à Fullenrich et poll jusqu'à FINISHED.
+    Retourne la réponse finale, ou None en cas d'erreur (déjà affichée, préfixée par `prefix`).
+    """
+    try:
+        resp = _FE_SESSION.post(
+            f"{FULLENRICH_BASE_URL}/contact/enrich/bulk",
+            json={"name": name, "data": payload_data},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        bulk_resp = _json(resp)
+    except requests.exceptions.HTTPError as e:
+        print(f"{prefix}Erreur HTTP Fullenrich ({e.response.status_code}): {e.response.text[:300]}")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"{prefix}Erreur réseau Fullenrich : {e}")
+        return None
+
+    enrichment_id = bulk_resp.get("enrichment_id") or bulk_resp.get("id", "")
+    if not enrichment_id:
+        print(f"{prefix}Erreur : pas d'identifiant d'enrichissement reçu. Réponse : {bulk_resp}")
+        return None
+
+    print(f"{prefix}Enrichissement lancé (ID : {enrichment_id})")
+    print(f"{prefix}Attente des résultats (polling de 1 à {FULLENRICH_POLL_MAX_DELAY} s d'intervalle)...")
+
+    # Délais croissants (fullenrich_poll_delays), allongés si Fullenrich envoie Retry-After
+    retry_after = 0.0
+    for attempt, delay in enumerate(fullenrich_poll_delays(), 1):
+        time.sleep(max(delay, retry_after))
+        try:
+            resp = _FE_SESSION.get(
+                f"{FULLENRICH_BASE_URL}/contact/enrich/bulk/{enrichment_id}",
+                timeout=30,
+            )
+            retry_after = retry_after_seconds(resp)
+            if resp.status_code == 429:
+                print(f"{prefix}Tentative {attempt} — limite de débit atteinte, nouvelle tentative")
+                continue
+            if resp.status_code == 402:
+                body = _json(resp) if resp.content else {}
+                print(f"{prefix}Crédits insuffisants (402) : {body.get('message', resp.text[:200])}")
+                return None
+            if 400 <= resp.status_code < 500:
+                print(f"{prefix}Erreur client Fullenrich ({resp.status_code}) : {resp.text[:200]}")
+                return None
+            resp.raise_for_status()
+            result = _json(resp)
+        except requests.exceptions.RequestException as e:
+            print(f"{prefix}Tentative {attempt} - erreur réseau : {e}")
+            continue
+
+        status: str = result.get("status", "UNKNOWN").upper()
+        print(f"{prefix}Tentative {attempt} — statut : {status}")
+
+        if status == "FINISHED":
+            return result
+
+        if status in ("CANCELED", "CREDITS_INSUFFICIENT", "RATE_LIMIT"):
+            print(f"{prefix}Enrichissement interrompu ({status}).")
+            return None
+
+    print(f"{prefix}Timeout : résultats non reçus après {FULLENRICH_POLL_MAX * FULLENRICH_POLL_INTERVAL} s.")
+    return None
+
+
 def enrich_with_fullenrich(companies_info: list[dict]) -> list[dict]:
     """
     Enrichit les dirigeants via l'API Fullenrich (bulk v2).
@@ -753,7 +1093,7 @@ def enrich_with_fullenrich(companies_info: list[dict]) -> list[dict]:
         contact: dict = {
             "first_name": c["_prenom"],
             "last_name": c["_nom"],
-            "enrich_fields": ["contact.emails", "contact.phones"],
+            "enrich_fields": FULLENRICH_ENRICH_FIELDS,
         }
         if c.get("_domaine"):
             contact["domain"] = c["_domaine"]
@@ -761,104 +1101,59 @@ def enrich_with_fullenrich(companies_info: list[dict]) -> list[dict]:
             contact["company_name"] = c["_nom_entreprise_raw"]
         payload_data.append(contact)
 
-    payload = {
-        "name": f"recherche-entreprises-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
-        "data": payload_data,
-    }
-
-    headers = {
-        "Authorization": f"Bearer {_fullenrich_key()}",
-        "Content-Type": "application/json",
-    }
-
-    # --- Lancement de l'enrichissement ---
-    print(f"\n  Envoi de {n} contact(s) à Fullenrich...")
-    try:
-        resp = requests.post(
-            f"{FULLENRICH_BASE_URL}/contact/enrich/bulk",
-            json=payload,
-            headers=headers,
-            timeout=30,
-        )
-        resp.raise_for_status()
-        bulk_resp = resp.json()
-    except requests.exceptions.HTTPError as e:
-        print(f"  Erreur HTTP Fullenrich ({e.response.status_code}): {e.response.text[:300]}")
-        return companies_info
-    except requests.exceptions.RequestException as e:
-        print(f"  Erreur réseau Fullenrich : {e}")
-        return companies_info
+    batches = [
+        (offset, payload_data[offset:offset + FULLENRICH_BATCH_SIZE])
+        for offset in range(0, n, FULLENRICH_BATCH_SIZE)
+    ]
+    name = f"recherche-entreprises-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+    # --- Lancement de l'enrichissement (lots en parallèle au-delà de FULLENRICH_BATCH_SIZE) ---
+    if len(batches) > 1:
+        print(f"\n  Envoi de {n} contact(s) à Fullenrich en {len(batches)} lots...")
+        jobs = [
+            (f"{name}-{k}", batch, f"  [lot {k}/{len(batches)}] ")
+            for k, (_, batch) in enumerate(batches, 1)
+        ]
+        with ThreadPoolExecutor(max_workers=min(len(batches), FULLENRICH_MAX_PARALLEL)) as pool:
+            results = list(pool.map(lambda job: _fullenrich_bulk(*job), jobs))
+    else:
+        print(f"\n  Envoi de {n} contact(s) à Fullenrich...")
+        results = [_fullenrich_bulk(name, payload_data, "  ")]
 
-    enrichment_id = bulk_resp.get("enrichment_id") or bulk_resp.get("id", "")
-    if not enrichment_id:
-        print(f"  Erreur : pas d'identifiant d'enrichissement reçu. Réponse : {bulk_resp}")
+    if all(r is None for r in results):
         return companies_info
 
-    print(f"  Enrichissement lancé (ID : {enrichment_id})")
-    print(f"  Attente des résultats (polling toutes les {FULLENRICH_POLL_INTERVAL}s)...")
-
-    # --- Polling ---
-    for attempt in range(1, FULLENRICH_POLL_MAX + 1):
-        time.sleep(FULLENRICH_POLL_INTERVAL)
-        try:
-            resp = requests.get(
-                f"{FULLENRICH_BASE_URL}/contact/enrich/bulk/{enrichment_id}",
-                headers={"Authorization": f"Bearer {_fullenrich_key()}"},
-                timeout=30,
-            )
-            if resp.status_code == 402:
-                body = resp.json() if resp.content else {}
-                print(f"  Crédits insuffisants (402) : {body.get('message', resp.text[:200])}")
-                break
-            if 400 <= resp.status_code < 500:
-                print(f"  Erreur client Fullenrich ({resp.status_code}) : {resp.text[:200]}")
-                break
-            resp.raise_for_status()
-            result = resp.json()
-        except requests.exceptions.RequestException as e:
-            print(f"  Tentative {attempt}/{FULLENRICH_POLL_MAX} - erreur réseau : {e}")
+    # --- Report des résultats (index d'origine = offset du lot + position) ---
+    enriched_count = 0
+    credits_used = 0
+    for (offset, batch), result in zip(batches, results):
+        if result is None:
             continue
+        records: list[dict] = result.get("data", [])
+        for j, record in enumerate(records[:len(batch)]):
+            original_idx = to_enrich[offset + j][0]
+            contact_info: dict = record.get("contact_info") or {}
 
-        status: str = result.get("status", "UNKNOWN").upper()
-        print(f"  Tentative {attempt}/{FULLENRICH_POLL_MAX} — statut : {status}")
-
-        if status == "FINISHED":
-            records: list[dict] = result.get("data", [])
-            enriched_count = 0
-
-            for j, record in enumerate(records):
-                if j >= len(to_enrich):
-                    break
-                original_idx = to_enrich[j][0]
-                contact_info: dict = record.get("contact_info") or {}
+            # Email
+            email_obj = contact_info.get("most_probable_work_email") or {}
+            email = email_obj.get("email", "")
+            if not email:
+                email_obj2 = contact_info.get("most_probable_personal_email") or {}
+                email = email_obj2.get("email", "")
 
-                # Email
-                email_obj = contact_info.get("most_probable_work_email") or {}
-                email = email_obj.get("email", "")
-                if not email:
-                    email_obj2 = contact_info.get("most_probable_personal_email") or {}
-                    email = email_obj2.get("email", "")
+            # Mobile
+            phone_obj = contact_info.get("most_probable_phone") or {}
+            mobile = phone_obj.get("number", "")
 
-                # Mobile
-                phone_obj = contact_info.get("most_probable_phone") or {}
-                mobile = phone_obj.get("number", "")
+            companies_info[original_idx]["email_dirigeant"] = email
+            companies_info[original_idx]["mobile_dirigeant"] = mobile
 
-                companies_info[original_idx]["email_dirigeant"] = email
-                companies_info[original_idx]["mobile_dirigeant"] = mobile
+            if email or mobile:
+                enriched_count += 1
+        credits_used += (result.get("cost") or {}).get("credits") or 0
 
-                if email or mobile:
-                    enriched_count += 1
-
-            print(f"\n  Enrichissement terminé : {enriched_count}/{n} contact(s) enrichi(s)")
-            credits_used = result.get("cost", {}).get("credits", "?")
-            print(f"  Crédits consommés : {credits_used}")
-            break
-
-        if status in ("CANCELED", "CREDITS_INSUFFICIENT", "RATE_LIMIT"):
-            print(f"  Enrichissement interrompu ({status}).")
-            break
-    else:
-        print(f"  Timeout : résultats non reçus après {FULLENRICH_POLL_MAX} tentatives.")
+    print(f"\n  Enrichissement terminé : {enriched_count}/{n} contact(s) enrichi(s)")
+    print(f"  Crédits consommés : {credits_used}")
 
     return companies_info
 
@@ -886,14 +1181,13 @@ def export_csv(companies_info: list[dict], output_path: str) -> None:
     if parent:
         os.makedirs(parent, exist_ok=True)
 
-    rows = [{k: c.get(k, "") for k in CSV_FIELDS} for c in companies_info]
-
     with open(output_path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, delimiter=";")
-        writer.writeheader()
-        writer.writerows(rows)
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(CSV_FIELDS)
+        # extract_company_info renseigne toujours toutes les colonnes de CSV_FIELDS
+        writer.writerows(map(itemgetter(*CSV_FIELDS), companies_info))
 
-    print(f"\nExport CSV terminé : {output_path}  ({len(rows)} ligne(s))")
+    print(f"\nExport CSV terminé : {output_path}  ({len(companies_info)} ligne(s))")
 
 
 # ---------------------------------------------------------------------------
@@ -927,6 +1221,12 @@ def main() -> None:
     print(f"  Max enrichissements Fullenrich : {args.max_enrichissements}")
     print(f"{'═' * 60}")
 
+    if not args.no_cache:
+        try:
+            enable_details_disk_cache()
+        except sqlite3.Error as e:
+            print(f"\n  Cache disque indisponible ({e}) : fiches rechargées depuis Pappers.")
+
     # 1. Recherche Pappers
     companies_raw, _ = search_pappers(args)
 
@@ -935,22 +1235,27 @@ def main() -> None:
         sys.exit(0)
 
     # 2. Récupération des détails
+    # En parallèle (PAPPERS_MAX_WORKERS requêtes en vol, débit borné par le limiteur
+    # PAPPERS_RATE) ; affichage dans l'ordre au fil des réponses.
     print(f"\nRécupération du détail pour {len(companies_raw)} entreprise(s)...")
     companies_info: list[dict] = []
 
-    for i, company in enumerate(companies_raw, 1):
-        siren = company.get("siren", "")
-        label = company.get("nom_entreprise") or company.get("denomination") or siren
-        print(f"  [{i:>3}/{len(companies_raw)}] {label}", end="", flush=True)
-
-        details = {}
-        if siren:
-            details = get_company_details(siren)
-            time.sleep(PAPPERS_DELAY)
-
-        info = extract_company_info(company, details)
-        companies_info.append(info)
-        print(f"  — dirigeant : {info['nom_dirigeant'] or '?'}, âge : {info['age_dirigeant'] or '?'}")
+    with ThreadPoolExecutor(max_workers=PAPPERS_MAX_WORKERS) as pool:
+        futures = [
+            pool.submit(get_company_details, c["siren"])
+            if c.get("siren") and _needs_details(c) else None
+            for c in companies_raw
+        ]
+        for i, (company, future) in enumerate(zip(companies_raw, futures), 1):
+            details = future.result() if future is not None else {}
+
+            info = extract_company_info(company, details)
+            companies_info.append(info)
+            label = company.get("nom_entreprise") or company.get("denomination") or company.get("siren", "")
+            print(
+                f"  [{i:>3}/{len(companies_raw)}] {label}"
+                f"  — dirigeant : {info['nom_dirigeant'] or '?'}, âge : {info['age_dirigeant'] or '?'}"
+            )
 
     # 3. Enrichissement Fullenrich (sur les N premiers)
     if args.max_enrichissements > 0: